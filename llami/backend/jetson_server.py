@@ -1,11 +1,17 @@
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 import httpx
-from llami.backend.robot_server import extract_policy
 from llami.configs.policy_extraction_prompt import get_extraction_prompt
+from llami.tracing import TRACE_HEADER, record_span, span, trace, trace_headers
 app = FastAPI()
 
+# RobotServer serves HTTPS with a self-signed certificate (see `RobotServer.check_or_create_ssl_certificates`)
+ROBOT_SERVER_URL = os.environ.get("ROBOT_SERVER_URL", "https://localhost:8443")
+# Path to the robot server certificate to trust, or "0" to skip verification
+ROBOT_SERVER_CERT = os.environ.get("ROBOT_SERVER_CERT", "cert.pem")
+
 def available_policies():
     """
     Return the list of available policies in configs/trained_policies
@@ -31,10 +37,15 @@ class LlamaRequest(BaseModel):
 # Define the endpoint
 
 @app.post("/llama")
-async def process_prompt(prompt_request: LlamaRequest):
+async def process_prompt(prompt_request: LlamaRequest, request: Request):
+    with trace(request.headers.get(TRACE_HEADER)), span("process_prompt"):
+        return await _process_prompt(prompt_request)
+
+async def _process_prompt(prompt_request: LlamaRequest):
     # Prepare the payload for the POST request
     
-    prompt = get_extraction_prompt(prompt_request.prompt)
+    with span("prompt_build"):
+        prompt = get_extraction_prompt(prompt_request.prompt)
     payload = {
         "prompt": prompt,
         "n_predict": 128
@@ -45,33 +56,52 @@ async def process_prompt(prompt_request: LlamaRequest):
     
     try:
         # Make the POST request to the external API
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                url=target_url,
-                json=payload,
-                headers={"Content-Type": "application/json"}
-            )
+        completion_start = time.time()
+        with span("llama_completion"):
+            async with httpx.AsyncClient() as client:
+                response = await client.post(
+                    url=target_url,
+                    json=payload,
+                    headers={"Content-Type": "application/json", **trace_headers()}
+                )
             
         # Raise an exception if the request failed
         response.raise_for_status()
 
         # Parse the response JSON
         response_data = response.json()
+
+        # llama.cpp reports its own prefill/decode split, laid out from the start of the completion request
+        timings = response_data.get("timings", {})
+        prompt_ms = timings.get("prompt_ms", 0.0)
+        if "prompt_ms" in timings:
+            record_span("prefill", prompt_ms, start=completion_start, tokens=timings.get("prompt_n"))
+        if "predicted_ms" in timings:
+            record_span(
+                "decode",
+                timings["predicted_ms"],
+                start=completion_start + prompt_ms / 1e3,
+                tokens=timings.get("predicted_n"),
+            )
+
         # Extract the `answer` key
         if "content" in response_data:
 
-            policy = extract_policy(response_data["content"])
+            with span("parse"):
+                policy = extract_policy(response_data["content"])
 
         
-            fancesco_url = f"http://localhost:8080/execute_policy/{policy}"
-            # Make the POST request to the external API
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    url=target_url,
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                
+            robot_url = f"{ROBOT_SERVER_URL}/execute_policy/{policy}"
+            verify = False if ROBOT_SERVER_CERT == "0" else ROBOT_SERVER_CERT
+            # The robot server only answers once the whole control loop is over: no timeout
+            with span("robot_request", policy=policy):
+                async with httpx.AsyncClient(verify=verify, timeout=None) as client:
+                    response = await client.get(
+                        url=robot_url,
+                        headers={"Content-Type": "application/json", **trace_headers()}
+                    )
+            response.raise_for_status()
+
             return {"content": response_data["content"]}
         else:
             raise HTTPException(status_code=500, detail="Invalid response from external API")
@@ -1,11 +1,15 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from typing import Optional
 from dataclasses import dataclass
 
+import asyncio
+import json
 import os 
 import sys
 import subprocess
 import ssl
+import time
 from pathlib import Path
 
 # Add project root to Python path
@@ -13,7 +17,9 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(".")
 
 from llami.configs.policy_extraction_prompt import get_extraction_prompt
+from llami.robot.camera_preview import CameraPreview
 from llami.robot.robot_router import run_policy
+from llami.tracing import TRACE_HEADER, record_span, span, trace
 from lerobot.common.robot_devices.robots.factory import make_robot
 from lerobot.common.robot_devices.robots.utils import Robot
 from lerobot.common.utils.utils import init_hydra_config
@@ -63,6 +69,11 @@ class RobotServer:
         self.robot.connect()
         self.policy_extraction_prompt = get_extraction_prompt
 
+        # camera frames are streamed from /preview instead of being displayed on the robot host
+        self.preview = CameraPreview()
+        # policies run in a worker thread so that the event loop keeps serving the preview; one at a time
+        self.policy_lock = asyncio.Lock()
+
         # Add SSL configuration
         self.ssl_keyfile = "key.pem"
         self.ssl_certfile = "cert.pem"
@@ -75,11 +86,13 @@ class RobotServer:
         @self.app.on_event("startup")
         async def startup():
             """Initialize robot on server startup"""
+            self.preview.start()
             return {"status": "Robot connected"}
 
         @self.app.on_event("shutdown")
         async def shutdown():
             """Cleanup robot connection on server shutdown"""
+            self.preview.stop()
             if self.robot and self.robot.is_connected:
                 self.robot.disconnect()
             return {"status": "Robot disconnected"}
@@ -89,14 +102,44 @@ class RobotServer:
             return {"status": "ok"}
 
         @self.app.get("/execute_policy/{policy_name}")
-        async def execute_policy(policy_name: str):
+        async def execute_policy(policy_name: str, request: Request):
             """Execute a given robot policy"""
-            run_policy(
-                robot=self.robot,
-                policy_name=policy_name
-            )
+            with trace(request.headers.get(TRACE_HEADER)), span("execute_policy", policy=policy_name):
+                await self.run_policy(policy_name)
             return {"status": f"Executing policy: {policy_name}"}
 
+        @self.app.get("/preview")
+        async def preview_cameras():
+            return {"cameras": list(self.robot.cameras)}
+
+        @self.app.get("/preview/{camera_name}")
+        async def preview_stream(camera_name: str):
+            """MJPEG stream of a camera, viewable directly in a browser `<img>` tag"""
+            if camera_name not in self.robot.cameras:
+                raise HTTPException(status_code=404, detail=f"Unknown camera '{camera_name}'")
+
+            async def frames():
+                async for jpeg in self.preview.jpegs(camera_name):
+                    yield b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n"
+
+            return StreamingResponse(frames(), media_type="multipart/x-mixed-replace; boundary=frame")
+
+        @self.app.websocket("/preview/{camera_name}/ws")
+        async def preview_websocket(websocket: WebSocket, camera_name: str):
+            """Same as /preview/{camera_name}, sending each JPEG as a binary message"""
+            if camera_name not in self.robot.cameras:
+                await websocket.close(code=1008, reason=f"Unknown camera '{camera_name}'")
+                return
+
+            await websocket.accept()
+            try:
+                async for jpeg in self.preview.jpegs(camera_name):
+                    await websocket.send_bytes(jpeg)
+            except WebSocketDisconnect:
+                return
+            # the preview was stopped
+            await websocket.close()
+
         @self.app.websocket("/ws")
         async def websocket_endpoint(websocket: WebSocket):
             """Optional WebSocket endpoint if you still need real-time communication"""
@@ -104,43 +147,57 @@ class RobotServer:
             try:
                 while True:
                     policy_name = await websocket.receive_text()
-                    run_policy(
-                        robot=self.robot,
-                        policy_name=policy_name
-                    )
+                    # one trace per policy, not per connection
+                    with trace(), span("execute_policy", policy=policy_name):
+                        await self.run_policy(policy_name)
                     await websocket.send_json({"status": f"Executed policy: {policy_name}"})
             except Exception:
                 await websocket.close()
         
         @self.app.post("/llama")
-        async def llama(request: LlamaRequest):
-            # augments the prompt with the user input
-            prompt = self.policy_extraction_prompt(request.prompt)
-            # binaries for the llama model
-            directory = "llami/backend/models/"
-            binary_llama = directory+"llama_main_xnnpack_arm"
-            model_weights = directory+"llama3_2_xnn.pte"
-            tokenizer = directory+"tokenizer.model"
-            command = [
-                binary_llama, 
-                "--model_path", 
-                model_weights, 
-                "--tokenizer_path", 
-                tokenizer, 
-                "--prompt", 
-                prompt
-            ]
-            text = subprocess.run(command, capture_output=True).stdout
-
-            policy_name = self.extract_policy(text)
-
-            run_policy(
-                robot=self.robot,
-                policy_name=policy_name
-            )
+        async def llama(request: LlamaRequest, http_request: Request):
+            with trace(http_request.headers.get(TRACE_HEADER)), span("llama"):
+                # augments the prompt with the user input
+                with span("prompt_build"):
+                    prompt = self.policy_extraction_prompt(request.prompt)
+                # binaries for the llama model
+                directory = "llami/backend/models/"
+                binary_llama = directory+"llama_main_xnnpack_arm"
+                model_weights = directory+"llama3_2_xnn.pte"
+                tokenizer = directory+"tokenizer.model"
+                command = [
+                    binary_llama, 
+                    "--model_path", 
+                    model_weights, 
+                    "--tokenizer_path", 
+                    tokenizer, 
+                    "--prompt", 
+                    prompt
+                ]
+                generate_start = time.time()
+                with span("llama_generate"):
+                    # off the event loop, which keeps serving the camera preview during generation
+                    text = (await asyncio.to_thread(subprocess.run, command, capture_output=True)).stdout
+                self.record_llama_timings(text, generate_start)
+
+                with span("parse"):
+                    policy_name = self.extract_policy(text)
+
+                with span("execute_policy", policy=policy_name):
+                    await self.run_policy(policy_name)
             
             return {"status": "ok"}
         
+    async def run_policy(self, policy_name: str):
+        async with self.policy_lock:
+            # `to_thread` copies the current context, so the trace carries over to the policy spans
+            await asyncio.to_thread(
+                run_policy,
+                robot=self.robot,
+                policy_name=policy_name,
+                preview=self.preview,
+            )
+
     def extract_answer_from_llama_output(output: str):
         """
         Some additional information is printed after the answer, we need to remove it (performance metrics, etc.)
@@ -148,6 +205,40 @@ class RobotServer:
         eot_id = output.find("PyTorchObserver")
         return output[:eot_id]
 
+    def record_llama_timings(self, output: bytes, generate_start: float):
+        """
+        The llama runner prints its stats as `PyTorchObserver {...}`, from which the model load, prefill and decode
+        spans are recorded. Its timestamps come from its own clock, so they are laid out from `generate_start`, the
+        wall-clock time at which the runner was launched
+        """
+        output = output.decode("utf-8", errors="ignore")
+        observer_id = output.find("PyTorchObserver")
+        if observer_id == -1:
+            return
+        try:
+            stats = json.loads(output[observer_id + len("PyTorchObserver"):].strip().splitlines()[0])
+        except (json.JSONDecodeError, IndexError):
+            return
+
+        # timestamps are expressed in units of 1 / SCALING_FACTOR_UNITS_PER_SECOND seconds
+        to_ms = 1e3 / stats.get("SCALING_FACTOR_UNITS_PER_SECOND", 1e3)
+        origin = stats.get("model_load_start_ms", stats.get("inference_start_ms"))
+        if origin is None:
+            return
+
+        def record_stage(name: str, start_key: str, end_key: str, **attributes):
+            if start_key in stats and end_key in stats:
+                record_span(
+                    name,
+                    (stats[end_key] - stats[start_key]) * to_ms,
+                    start=generate_start + (stats[start_key] - origin) * to_ms / 1e3,
+                    **attributes,
+                )
+
+        record_stage("model_load", "model_load_start_ms", "model_load_end_ms")
+        record_stage("prefill", "inference_start_ms", "prompt_eval_end_ms", tokens=stats.get("prompt_tokens"))
+        record_stage("decode", "prompt_eval_end_ms", "inference_end_ms", tokens=stats.get("generated_tokens"))
+
     # Process the text to extract the policy
     def extract_policy(self, text: bytes):
         text = text.decode("utf-8")
@@ -178,10 +269,21 @@ if __name__ == "__main__":
     import uvicorn
 
     server = RobotServer()
-    uvicorn.run(
-        server.app, 
-        host="0.0.0.0", 
-        port=8443,  # Standard HTTPS port
-        ssl_keyfile=server.ssl_keyfile,
-        ssl_certfile=server.ssl_certfile
-    )
\ No newline at end of file
+    uvicorn_server = uvicorn.Server(
+        uvicorn.Config(
+            server.app, 
+            host="0.0.0.0", 
+            port=8443,  # Standard HTTPS port
+            ssl_keyfile=server.ssl_keyfile,
+            ssl_certfile=server.ssl_certfile
+        )
+    )
+
+    # open preview streams never end on their own and would keep uvicorn waiting on their connections at exit
+    handle_exit = uvicorn_server.handle_exit
+    def stop_preview_and_exit(sig, frame):
+        server.preview.stop()
+        handle_exit(sig, frame)
+    uvicorn_server.handle_exit = stop_preview_and_exit
+
+    uvicorn_server.run()
\ No newline at end of file
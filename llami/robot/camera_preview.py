@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from llami.robot.hooks import hook_robot
+
+IMAGE_KEY_PREFIX = "observation.images."
+
+
+class CameraPreview:
+    """Downscaled JPEG preview of the robot cameras, encoded off the control thread.
+
+    The control loop only hands off references to its latest frames with `submit` (no copy, no lock held while
+    encoding). A worker thread picks up the most recent frame of each camera at most `fps` times per second, resizes
+    it to `width` pixels wide and JPEG-encodes it. Frames submitted in between are simply dropped. Nothing is encoded
+    while no viewer is connected, and viewers (see `jpegs`) are woken up on their own event loop when a new JPEG is
+    ready, without holding any thread.
+    """
+    def __init__(self, fps: int = 10, width: int = 320, jpeg_quality: int = 70):
+        self.fps = fps
+        self.width = width
+        self.jpeg_quality = jpeg_quality
+
+        self._frames: dict[str, np.ndarray] = {}
+        self._jpegs: dict[str, tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+        self._viewers: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="camera_preview", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the worker and ends every open `jpegs` stream. Safe to call more than once."""
+        self._stop_event.set()
+        self._notify_viewers()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, name: str, frame):
+        """Non-blocking handoff of an RGB frame (numpy array or CPU tensor, HxWx3 uint8) from the control loop."""
+        # single dict assignment, atomic under the GIL: the control loop never waits on the encoder
+        self._frames[name] = frame
+
+    def submit_observation(self, observation: dict):
+        for key, frame in observation.items():
+            if key.startswith(IMAGE_KEY_PREFIX):
+                self.submit(key[len(IMAGE_KEY_PREFIX):], frame)
+
+    def _encode(self, frame) -> bytes | None:
+        import cv2
+
+        frame = np.asarray(frame)
+        height, width = frame.shape[:2]
+        if width > self.width:
+            frame = cv2.resize(frame, (self.width, int(height * self.width / width)), interpolation=cv2.INTER_AREA)
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return jpeg.tobytes() if ok else None
+
+    def _notify_viewers(self):
+        with self._lock:
+            viewers = list(self._viewers)
+        for loop, event in viewers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # the viewer's event loop is already closed
+                pass
+
+    def _run(self):
+        period = 1 / self.fps
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            if self._viewers:
+                # grab-and-clear so that an unchanged frame is not encoded twice
+                frames, self._frames = self._frames, {}
+                encoded = False
+                for name, frame in frames.items():
+                    try:
+                        jpeg = self._encode(frame)
+                    except Exception as e:
+                        logging.warning(f"Could not encode preview frame of camera '{name}': {e}")
+                        continue
+                    if jpeg is None:
+                        continue
+                    with self._lock:
+                        index = self._jpegs[name][0] + 1 if name in self._jpegs else 0
+                        self._jpegs[name] = (index, jpeg)
+                    encoded = True
+                if encoded:
+                    self._notify_viewers()
+            self._stop_event.wait(max(0.0, period - (time.perf_counter() - start)))
+
+    async def jpegs(self, name: str):
+        """Yields every new JPEG of camera `name` as it gets encoded, until the preview is stopped."""
+        event = asyncio.Event()
+        viewer = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._viewers.add(viewer)
+        try:
+            last_index = -1
+            while not self._stop_event.is_set():
+                await event.wait()
+                event.clear()
+                with self._lock:
+                    index, jpeg = self._jpegs.get(name, (-1, None))
+                if index > last_index and not self._stop_event.is_set():
+                    last_index = index
+                    yield jpeg
+        finally:
+            with self._lock:
+                self._viewers.discard(viewer)
+
+
+@contextmanager
+def stream_cameras(robot, preview: CameraPreview | None):
+    """Hands off every observation captured in the enclosed block to `preview`."""
+    if preview is None:
+        yield
+        return
+
+    def wrap_capture_observation(capture_observation):
+        def streamed_capture_observation(*args, **kwargs):
+            observation = capture_observation(*args, **kwargs)
+            preview.submit_observation(observation)
+            return observation
+        return streamed_capture_observation
+
+    with hook_robot(robot, "camera_preview", capture_observation=wrap_capture_observation):
+        yield
@@ -0,0 +1,56 @@
+from contextlib import contextmanager
+
+# Layers that may wrap robot methods, innermost first. However their context managers are nested, the bus profiler
+# always sits right around the robot method (so that its end-of-tick writes are part of the sent action), the
+# first action span around it, and the camera preview outermost.
+HOOK_LAYERS = ("profile_motors", "trace_first_action", "camera_preview")
+
+_MISSING = object()
+
+
+def _rebuild(robot, method_name: str):
+    hooks = robot.__dict__["_hooks"]
+    original = robot.__dict__["_hook_originals"][method_name]
+    layers = hooks.get(method_name, {})
+
+    if not layers:
+        # nothing left wrapping this method: put the robot back as it was
+        del robot.__dict__["_hook_originals"][method_name]
+        hooks.pop(method_name, None)
+        if original is _MISSING:
+            robot.__dict__.pop(method_name, None)
+        else:
+            robot.__dict__[method_name] = original
+        return
+
+    method = getattr(type(robot), method_name).__get__(robot) if original is _MISSING else original
+    for layer in HOOK_LAYERS:
+        if layer in layers:
+            method = layers[layer](method)
+    robot.__dict__[method_name] = method
+
+
+@contextmanager
+def hook_robot(robot, layer: str, **wrappers):
+    """Wraps robot methods for the duration of the block, e.g. `hook_robot(robot, "camera_preview", send_action=f)`.
+
+    Each wrapper receives the method it wraps and returns its replacement. Wrappers are stacked following
+    `HOOK_LAYERS`, and the robot is restored when the block exits.
+    """
+    if layer not in HOOK_LAYERS:
+        raise ValueError(f"Unknown hook layer '{layer}'. Available layers are {HOOK_LAYERS}.")
+
+    hooks = robot.__dict__.setdefault("_hooks", {})
+    originals = robot.__dict__.setdefault("_hook_originals", {})
+    for method_name, wrapper in wrappers.items():
+        if layer in hooks.get(method_name, {}):
+            raise RuntimeError(f"`{method_name}` is already hooked by '{layer}'.")
+        originals.setdefault(method_name, robot.__dict__.get(method_name, _MISSING))
+        hooks.setdefault(method_name, {})[layer] = wrapper
+        _rebuild(robot, method_name)
+    try:
+        yield
+    finally:
+        for method_name in wrappers:
+            hooks[method_name].pop(layer, None)
+            _rebuild(robot, method_name)
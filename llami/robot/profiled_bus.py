@@ -0,0 +1,300 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import numpy as np
+
+from llami.robot.hooks import hook_robot
+
+# Data names whose writes are buffered during a tick and sent as one group sync write.
+COALESCED_WRITES = ("Goal_Position",)
+# Size in bytes of a register when the bus exposes no control table (e.g. `SimulatedFollower`).
+DEFAULT_DATA_BYTES = 2
+# Feetech/Dynamixel sync packet overheads: header(2) + id(1) + length(1) + instruction(1) + address(1) +
+# data length(1) + checksum(1), and for every status packet header(2) + id(1) + length(1) + error(1) + checksum(1).
+SYNC_PACKET_OVERHEAD = 8
+STATUS_PACKET_OVERHEAD = 6
+
+
+@dataclass
+class BusTransaction:
+    kind: str  # "read" or "write"
+    data_name: str
+    num_motors: int
+    num_bytes: int
+    duration_s: float
+    tick: int
+
+
+class ProfiledMotorsBus:
+    """Wraps a motors bus (`FeetechMotorsBus`, `SimulatedFollower`, ...) exposing the same `read`/`write` interface.
+
+    Every transaction reaching the wrapped bus is timed and sized. Within a tick (see `tick`), repeated reads of the
+    same register are served from a single group sync read, and writes to `COALESCED_WRITES` are buffered and flushed
+    as a single group sync write when the tick ends. Goal positions that did not move by more than `goal_deadband`
+    since they were last sent are not written at all.
+    """
+    def __init__(
+        self,
+        bus,
+        goal_deadband: float = 0.0,
+        coalesced_writes: tuple[str, ...] = COALESCED_WRITES,
+        max_transactions: int = 10_000,
+    ):
+        self.bus = bus
+        self.goal_deadband = goal_deadband
+        self.coalesced_writes = coalesced_writes
+        self.transactions: deque[BusTransaction] = deque(maxlen=max_transactions)
+        self.skipped_writes = 0
+
+        self.tick_index = 0
+        self.in_tick = False
+        self._read_cache: dict[str, np.ndarray] = {}
+        self._pending_writes: dict[str, dict[str, float]] = {}
+        self._last_goal: dict[str, float] = {}
+
+    def __getattr__(self, name):
+        # only called for attributes not found on the wrapper: forward them to the wrapped bus
+        # (`bus` may be missing, e.g. while `copy`/`pickle` probe an instance whose `__init__` did not run)
+        if "bus" not in self.__dict__:
+            raise AttributeError(name)
+        return getattr(self.__dict__["bus"], name)
+
+    @property
+    def motor_names(self) -> list[str]:
+        return self.bus.motor_names
+
+    def connect(self):
+        self._last_goal.clear()
+        return self.bus.connect()
+
+    def disconnect(self):
+        self.end_tick()
+        self._last_goal.clear()
+        return self.bus.disconnect()
+
+    def _motor_list(self, motor_names: str | list[str] | None) -> list[str]:
+        if motor_names is None:
+            return list(self.motor_names)
+        if isinstance(motor_names, str):
+            return [motor_names]
+        return list(motor_names)
+
+    def _data_bytes(self, data_name: str, motor_names: list[str]) -> int:
+        """Register size for `data_name`, looked up in the bus control table when available."""
+        ctrl_table = getattr(self.bus, "model_ctrl_table", None)
+        motors = getattr(self.bus, "motors", {})
+        if ctrl_table and motor_names and motor_names[0] in motors:
+            model = motors[motor_names[0]][1]
+            entry = ctrl_table.get(model, {}).get(data_name)
+            if entry is not None:
+                return entry[1]
+        return DEFAULT_DATA_BYTES
+
+    def _record(self, kind: str, data_name: str, motor_names: list[str], duration_s: float):
+        data_bytes = self._data_bytes(data_name, motor_names)
+        num_motors = len(motor_names)
+        if kind == "read":
+            # sync read request + one status packet per motor
+            num_bytes = SYNC_PACKET_OVERHEAD + num_motors + num_motors * (STATUS_PACKET_OVERHEAD + data_bytes)
+        else:
+            # sync write, no status packet returned
+            num_bytes = SYNC_PACKET_OVERHEAD + num_motors * (1 + data_bytes)
+
+        self.transactions.append(
+            BusTransaction(
+                kind=kind,
+                data_name=data_name,
+                num_motors=num_motors,
+                num_bytes=num_bytes,
+                duration_s=duration_s,
+                tick=self.tick_index,
+            )
+        )
+
+    def _bus_read(self, data_name: str, motor_names: list[str]) -> np.ndarray:
+        start = time.perf_counter()
+        values = self.bus.read(data_name, motor_names)
+        self._record("read", data_name, motor_names, time.perf_counter() - start)
+        return np.asarray(values)
+
+    def _bus_write(self, data_name: str, values: dict[str, float]):
+        motor_names = list(values.keys())
+        start = time.perf_counter()
+        self.bus.write(data_name, np.array(list(values.values())), motor_names)
+        self._record("write", data_name, motor_names, time.perf_counter() - start)
+
+    def read(self, data_name, motor_names: str | list[str] | None = None):
+        motor_names = self._motor_list(motor_names)
+
+        # a pending write to the same register must land before reading it back
+        if data_name in self._pending_writes:
+            self._flush(data_name)
+
+        if not self.in_tick:
+            return self._bus_read(data_name, motor_names)
+
+        if data_name not in self._read_cache:
+            # read every motor at once so later reads in this tick hit the cache
+            self._read_cache[data_name] = self._bus_read(data_name, list(self.motor_names))
+
+        values = self._read_cache[data_name]
+        all_names = list(self.motor_names)
+        return values[[all_names.index(name) for name in motor_names]].copy()
+
+    def write(self, data_name, values: int | float | np.ndarray, motor_names: str | list[str] | None = None):
+        motor_names = self._motor_list(motor_names)
+        values = np.broadcast_to(np.asarray(values), (len(motor_names),)).tolist()
+        requested = dict(zip(motor_names, values))
+
+        if data_name not in self.coalesced_writes:
+            # configuration writes (torque, modes, gains...) go straight through, after whatever was buffered before
+            # them so that the caller's order is kept. They invalidate the goal cache, since the arm may have moved
+            # freely in between
+            for pending_name in list(self._pending_writes):
+                self._flush(pending_name)
+            self._last_goal.clear()
+            self._read_cache.pop(data_name, None)
+            self._bus_write(data_name, requested)
+            return
+
+        self._pending_writes.setdefault(data_name, {}).update(requested)
+        if not self.in_tick:
+            self._flush(data_name)
+
+    def _flush(self, data_name: str):
+        pending = self._pending_writes.pop(data_name, {})
+        if data_name == "Goal_Position":
+            changed = {
+                name: value
+                for name, value in pending.items()
+                if name not in self._last_goal or abs(value - self._last_goal[name]) > self.goal_deadband
+            }
+            self.skipped_writes += len(pending) - len(changed)
+            pending = changed
+            self._last_goal.update(pending)
+
+        if not pending:
+            return
+        self._read_cache.pop(data_name, None)
+        self._bus_write(data_name, pending)
+
+    def begin_tick(self):
+        """Starts a new control tick, flushing whatever the previous one left pending."""
+        self.end_tick()
+        self.tick_index += 1
+        self.in_tick = True
+
+    def drop_read_cache(self):
+        """Makes the next reads of the tick hit the bus again."""
+        self._read_cache.clear()
+
+    def end_tick(self):
+        """Sends buffered writes as one group sync write per register and drops the read cache."""
+        for data_name in list(self._pending_writes):
+            self._flush(data_name)
+        self._read_cache.clear()
+        self.in_tick = False
+
+    @contextmanager
+    def tick(self):
+        self.begin_tick()
+        try:
+            yield self
+        finally:
+            self.end_tick()
+
+    def summary(self) -> dict:
+        """Per (kind, data_name) transaction count, bytes and latency, plus averages per tick."""
+        groups: dict[str, list[BusTransaction]] = {}
+        for transaction in self.transactions:
+            groups.setdefault(f"{transaction.kind}:{transaction.data_name}", []).append(transaction)
+
+        stats = {}
+        for key, transactions in groups.items():
+            durations_ms = np.array([t.duration_s for t in transactions]) * 1e3
+            stats[key] = {
+                "count": len(transactions),
+                "bytes": int(sum(t.num_bytes for t in transactions)),
+                "mean_ms": float(durations_ms.mean()),
+                "p50_ms": float(np.percentile(durations_ms, 50)),
+                "p95_ms": float(np.percentile(durations_ms, 95)),
+                "max_ms": float(durations_ms.max()),
+            }
+
+        num_ticks = len({t.tick for t in self.transactions}) or 1
+        return {
+            "transactions": stats,
+            "transactions_per_tick": len(self.transactions) / num_ticks,
+            "bytes_per_tick": sum(t.num_bytes for t in self.transactions) / num_ticks,
+            "skipped_writes": self.skipped_writes,
+        }
+
+    def reset_stats(self):
+        self.transactions.clear()
+        self.skipped_writes = 0
+
+
+@contextmanager
+def profile_robot(robot, goal_deadband: float = 0.0):
+    """Wraps the follower arms of a `ManipulatorRobot` with `ProfiledMotorsBus` for the duration of the block.
+
+    A tick spans from `capture_observation` to the end of the following `send_action`, so the Goal_Position write
+    is flushed as soon as the action is sent. Reads are only cached while the observation is captured: the cache is
+    dropped once `capture_observation` returns, so that the Present_Position read by `send_action` to clamp goals
+    to `max_relative_target` is taken after inference, not before. The original buses and methods are restored when
+    the block exits.
+    """
+    arms = dict(robot.follower_arms)
+    buses = {name: ProfiledMotorsBus(arm, goal_deadband=goal_deadband) for name, arm in arms.items()}
+
+    def wrap_capture_observation(capture_observation):
+        def profiled_capture_observation(*args, **kwargs):
+            for bus in buses.values():
+                bus.begin_tick()
+            try:
+                return capture_observation(*args, **kwargs)
+            finally:
+                for bus in buses.values():
+                    bus.drop_read_cache()
+        return profiled_capture_observation
+
+    def wrap_send_action(send_action):
+        def profiled_send_action(*args, **kwargs):
+            try:
+                return send_action(*args, **kwargs)
+            finally:
+                for bus in buses.values():
+                    bus.end_tick()
+        return profiled_send_action
+
+    robot.follower_arms.update(buses)
+    try:
+        with hook_robot(
+            robot,
+            "profile_motors",
+            capture_observation=wrap_capture_observation,
+            send_action=wrap_send_action,
+        ):
+            yield buses
+    finally:
+        for bus in buses.values():
+            bus.end_tick()
+        robot.follower_arms.update(arms)
+
+
+def log_bus_summary(buses: dict[str, ProfiledMotorsBus]):
+    for name, bus in buses.items():
+        summary = bus.summary()
+        logging.info(
+            f"[{name}] {summary['transactions_per_tick']:.2f} transactions/tick, "
+            f"{summary['bytes_per_tick']:.0f} bytes/tick, {summary['skipped_writes']} writes skipped"
+        )
+        for key, stats in summary["transactions"].items():
+            logging.info(
+                f"[{name}] {key}: n={stats['count']} bytes={stats['bytes']} "
+                f"mean={stats['mean_ms']:.2f}ms p50={stats['p50_ms']:.2f}ms "
+                f"p95={stats['p95_ms']:.2f}ms max={stats['max_ms']:.2f}ms"
+            )
@@ -1,6 +1,7 @@
 import argparse
 import logging
 import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 from typing import List
 import os
@@ -42,6 +43,11 @@ import asyncio
 import websockets
 import yaml
 
+from llami.robot.camera_preview import CameraPreview, stream_cameras
+from llami.robot.hooks import hook_robot
+from llami.robot.profiled_bus import log_bus_summary, profile_robot
+from llami.tracing import span
+
 ########################################################################################
 # Control modes
 ########################################################################################
@@ -58,6 +64,33 @@ def get_available_policies():
     
     return models
 
+@contextmanager
+def trace_first_action(robot: Robot):
+    """Records a `first_action` span ending when the first action of the enclosed block has been sent to the robot."""
+    first_action = span("first_action")
+    first_action.__enter__()
+    pending = True
+
+    def close():
+        nonlocal pending
+        if pending:
+            pending = False
+            first_action.__exit__(None, None, None)
+
+    def wrap_send_action(send_action):
+        def traced_send_action(*args, **kwargs):
+            action = send_action(*args, **kwargs)
+            close()
+            return action
+        return traced_send_action
+
+    try:
+        with hook_robot(robot, "trace_first_action", send_action=wrap_send_action):
+            yield
+    finally:
+        # no action was sent at all
+        close()
+
 @safe_disconnect
 def calibrate(robot: Robot, arms: list[str] | None):
     # TODO(aliberts): move this code in robots' classes
@@ -116,9 +149,19 @@ def teleoperate(
 def run_policy(
     robot: Robot,
     policy_name: str,
-    display_cameras: bool = True
+    display_cameras: bool = False,
+    preview: CameraPreview | None = None,
+    profile_motors: bool = False,
+    goal_deadband: float = 0.0,
 ):
-    """Execute a specific robotic policy."""
+    """Execute a specific robotic policy.
+
+    Camera frames are handed off to `preview` (if any) to be streamed off the control loop, rather than rendered in
+    windows on the robot host as with `display_cameras`.
+
+    With `profile_motors`, the follower buses are wrapped with `ProfiledMotorsBus` (coalescing per-tick bus
+    transactions and skipping goal positions within `goal_deadband`) and their statistics are logged at the end.
+    """
     _ = load_dotenv(find_dotenv())
 
     # Load available models from YAML files
@@ -130,19 +173,26 @@ def run_policy(
     # Initialize the requested policy
     model = models[policy_name]
     policy_overrides = ["device=mps"]
-    policy, policy_fps, device, use_amp = init_policy(model["repo_id"], policy_overrides)
+    with span("policy_load", repo_id=model["repo_id"]):
+        policy, policy_fps, device, use_amp = init_policy(model["repo_id"], policy_overrides)
+
+    profiler = profile_robot(robot, goal_deadband=goal_deadband) if profile_motors else nullcontext()
 
     # Execute the policy
-    control_loop(
-        robot=robot,
-        control_time_s=model["control_time_s"],
-        display_cameras=display_cameras,
-        policy=policy,
-        device=device,
-        use_amp=use_amp,
-        fps=policy_fps,
-        teleoperate=False,
-    )
+    with profiler as buses, span("control_loop"), trace_first_action(robot), stream_cameras(robot, preview):
+        control_loop(
+            robot=robot,
+            control_time_s=model["control_time_s"],
+            display_cameras=display_cameras,
+            policy=policy,
+            device=device,
+            use_amp=use_amp,
+            fps=policy_fps,
+            teleoperate=False,
+        )
+
+    if profile_motors:
+        log_bus_summary(buses)
 
 if __name__ == "__main__":
     # test call of run_policy
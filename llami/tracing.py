@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+import numpy as np
+
+# HTTP header carrying the trace id across jetson_server -> llama backend -> RobotServer hops.
+TRACE_HEADER = "X-Trace-Id"
+# Spans are appended here, one JSON object per line. Set `LLAMI_TRACE_FILE` to an empty string to disable tracing.
+# Each server writes its own spans: point every server at the same absolute path when they share a host, or pass all
+# their files to `summarize` to join the hops of a trace.
+TRACE_FILE = os.environ.get("LLAMI_TRACE_FILE", ".cache/traces/traces.jsonl")
+
+_trace_id: ContextVar[str | None] = ContextVar("trace_id", default=None)
+_span_id: ContextVar[str | None] = ContextVar("span_id", default=None)
+_write_lock = threading.Lock()
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def current_trace_id() -> str | None:
+    return _trace_id.get()
+
+
+def trace_headers() -> dict[str, str]:
+    """Headers to add to an outgoing request so that the next hop joins the current trace."""
+    trace_id = _trace_id.get()
+    return {TRACE_HEADER: trace_id} if trace_id else {}
+
+
+def _export(record: dict):
+    if not TRACE_FILE:
+        return
+    path = Path(TRACE_FILE)
+    line = json.dumps(record)
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+
+@contextmanager
+def trace(trace_id: str | None = None):
+    """Binds a trace id (typically read from `TRACE_HEADER`, else a fresh one) to the current context."""
+    trace_token = _trace_id.set(trace_id or new_id())
+    span_token = _span_id.set(None)
+    try:
+        yield _trace_id.get()
+    finally:
+        _span_id.reset(span_token)
+        _trace_id.reset(trace_token)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Times the enclosed block as a span of the current trace, nested under the enclosing span if any.
+
+    The yielded dict can be filled with extra attributes while the span is open.
+    """
+    span_id = new_id()
+    parent_id = _span_id.get()
+    token = _span_id.set(span_id)
+    start_time = time.time()
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1e3
+        _span_id.reset(token)
+        _export(
+            {
+                "trace_id": _trace_id.get(),
+                "span_id": span_id,
+                "parent_id": parent_id,
+                "name": name,
+                "start": start_time,
+                "duration_ms": duration_ms,
+                "attributes": attributes,
+            }
+        )
+
+
+def record_span(name: str, duration_ms: float, start: float | None = None, **attributes):
+    """Exports a span timed elsewhere (e.g. prefill/decode timings reported by the llama backend)."""
+    _export(
+        {
+            "trace_id": _trace_id.get(),
+            "span_id": new_id(),
+            "parent_id": _span_id.get(),
+            "name": name,
+            "start": start if start is not None else time.time() - duration_ms / 1e3,
+            "duration_ms": duration_ms,
+            "attributes": attributes,
+        }
+    )
+
+
+def load_spans(*paths: str | Path) -> list[dict]:
+    spans = []
+    for path in paths or (TRACE_FILE,):
+        with open(path) as f:
+            spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def summarize(*paths: str | Path, percentiles: tuple[int, ...] = (50, 90, 99)) -> dict[str, dict]:
+    """Latency percentiles (ms) per span name, plus `time_to_first_motion` per trace.
+
+    Spans of all `paths` (by default `TRACE_FILE`) are joined by trace id. Time to first motion is measured from the
+    earliest span start of a trace to the end of its `first_action` span.
+    """
+    spans = load_spans(*paths)
+
+    durations = defaultdict(list)
+    traces = defaultdict(list)
+    for record in spans:
+        durations[record["name"]].append(record["duration_ms"])
+        # spans recorded outside of any trace (e.g. a direct `run_policy` call) do not belong together
+        if record["trace_id"] is not None:
+            traces[record["trace_id"]].append(record)
+
+    for records in traces.values():
+        first_actions = [r for r in records if r["name"] == "first_action"]
+        if first_actions:
+            trace_start = min(r["start"] for r in records)
+            motion = min(r["start"] + r["duration_ms"] / 1e3 for r in first_actions)
+            durations["time_to_first_motion"].append((motion - trace_start) * 1e3)
+
+    summary = {}
+    for name, values in durations.items():
+        values = np.array(values)
+        summary[name] = {"count": len(values), "mean": float(values.mean())}
+        summary[name].update({f"p{p}": float(np.percentile(values, p)) for p in percentiles})
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize the latency of the spans recorded in trace files.")
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="*",
+        default=[TRACE_FILE],
+        help="JSONL files with the recorded spans, e.g. one per server.",
+    )
+    args = parser.parse_args()
+
+    summary = summarize(*args.paths)
+    columns = [column for column in next(iter(summary.values()), {}) if column != "count"]
+    print(f"{'span':<24}{'count':>8}" + "".join(f"{column + ' (ms)':>14}" for column in columns))
+    for name, stats in sorted(summary.items(), key=lambda item: -item[1]["mean"]):
+        print(f"{name:<24}{stats['count']:>8}" + "".join(f"{stats[column]:>14.1f}" for column in columns))